@@ -1,9 +1,15 @@
 import asyncio
+import hashlib
+import math
 import time
-from urllib.parse import urljoin
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote
 
 import httpx
-from fastapi import FastAPI, Request, HTTPException, Response
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
@@ -13,122 +19,492 @@ import os
 import sys
 
 # Load configuration from .env file
-API_KEYS = os.getenv("API_KEYS")
+# Expect semicolon-separated API keys; whitespace and empty entries (e.g. a trailing ';')
+# are dropped so they do not turn into invalid keys that the target API always rejects
+API_KEYS = [key.strip() for key in os.getenv("API_KEYS", "").split(";") if key.strip()]
 if not API_KEYS:
     sys.exit("Error: API_KEYS environment variable not set in .env. Please provide at least one API key separated by ';'.")
-API_KEYS = API_KEYS.split(";")  # Expect semicolon-separated API keys
 
 RATE_LIMIT = int(os.getenv("RATE_LIMIT", "15"))
+if RATE_LIMIT < 1:
+    sys.exit("Error: RATE_LIMIT must be at least 1 request per minute.")
+MAX_INFLIGHT = int(os.getenv("MAX_INFLIGHT", "200"))
+if MAX_INFLIGHT < 1:
+    sys.exit("Error: MAX_INFLIGHT must be at least 1.")
+# Optional: share rate-limit state between workers and instances through Redis
+REDIS_URL = os.getenv("REDIS_URL")
 TARGET_API_URL = os.getenv("TARGET_API_URL")
 if not TARGET_API_URL:
     sys.exit("Error: TARGET_API_URL environment variable not set in .env. Please provide the target API URL.")
+# Parsed once; proxied paths are appended to its path with a single separating slash
+TARGET_URL = httpx.URL(TARGET_API_URL)
+TARGET_PATH_PREFIX = TARGET_URL.path.rstrip("/") + "/"
+# Same path, still percent-encoded, for building target URLs from raw request bytes;
+# a request to /proxy with no nested path goes to TARGET_API_URL's path exactly
+TARGET_RAW_PATH = TARGET_URL.raw_path.split(b"?", 1)[0]
+TARGET_RAW_PATH_PREFIX = TARGET_RAW_PATH.rstrip(b"/") + b"/"
+
+# Connection-level headers that must not be forwarded in either direction (RFC 9110, 7.6.1),
+# plus host and content-length, which httpx and Starlette set for the new connection.
+# Kept as lowercase bytes to match raw ASGI header names without decoding
+HOP_BY_HOP_HEADERS = frozenset({
+    b"host",
+    b"content-length",
+    b"transfer-encoding",
+    b"connection",
+    b"keep-alive",
+    b"proxy-authenticate",
+    b"proxy-authorization",
+    b"te",
+    b"trailer",
+    b"trailers",
+    b"upgrade",
+})
+
+# Upstream statuses that are retried with another attempt: 429 moves on to the next key,
+# transient 5xx errors are retried after an exponential backoff of RETRY_BACKOFF * 2**attempt
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+RETRY_BACKOFF = 0.5
+# Upper bound for a 429 Retry-After delay, in rate-limit windows
+RETRY_AFTER_MAX_WINDOWS = 5
+
+def parse_retry_after(value: str | None, default: float, maximum: float) -> float:
+    """
+    Returns the delay in seconds from a Retry-After header, given either as seconds
+    or as an HTTP date, capped at `maximum`. Falls back to `default` when the header
+    is missing or invalid (including non-finite values such as "inf" or "nan").
+    """
+    if value is None:
+        return default
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return default
+    if not math.isfinite(delay):
+        return default
+    return min(max(0.0, delay), maximum)
 
 class APIKeyManager:
     """
     Class for managing API keys with a round-robin mechanism and rate limiting.
-    For each key, statistics are kept in memory: the number of requests and the start time of the current window.
+    Each key has an in-memory sliding-window counter: the request counts of the
+    previous and current fixed windows, with the previous one weighted by how much
+    of it still overlaps the sliding window. This keeps O(1) state per key and,
+    unlike a fixed window, does not allow a double burst around window boundaries.
     """
     def __init__(self, api_keys: list[str], rate_limit: int, window: int = 60):
         self.api_keys = api_keys
         self.rate_limit = rate_limit
         self.window = window  # Window interval in seconds (60 seconds = 1 minute)
-        self.lock = asyncio.Lock()
-        # Initialize counter and window start time for each key
-        self.stats = {key: {"count": 0, "window_start": time.time()} for key in api_keys}
+        # Shared by all callers waiting for a key to free up; set by a single timer
+        self._refill_event: asyncio.Event | None = None
+        # Counter state per key, stored as parallel lists indexed like api_keys.
+        # No lock is needed: the scan in get_available_key never awaits,
+        # so it runs atomically on the event loop
+        n = len(api_keys)
+        self.prev_counts = [0] * n
+        self.curr_counts = [0] * n
+        self.window_starts = [time.monotonic()] * n
         self.index = 0  # Current index for round-robin
 
     async def get_available_key(self) -> str:
         """
-        Returns an available API key that has not exceeded the request limit.
+        Returns an available API key whose estimated request count over the last
+        `window` seconds is below the limit.
         If the limit for the selected key is exhausted, tries the next ones.
-        If all keys are exhausted, waits for the minimum wait time to expire.
+        If all keys are exhausted, waits until the earliest key can be used again,
+        then retries. Concurrent waiters share one event and one timer rather
+        than each sleeping on its own.
+        """
+        # Bind hot attributes to locals once; the scan runs on every proxied request
+        n = len(self.api_keys)
+        keys = self.api_keys
+        prev_counts = self.prev_counts
+        curr_counts = self.curr_counts
+        window_starts = self.window_starts
+        rate = self.rate_limit
+        win = self.window
+        monotonic = time.monotonic
+        while True:
+            # The first caller back after a wake-up discards the fired event
+            if self._refill_event is not None and self._refill_event.is_set():
+                self._refill_event = None
+            # Index may have been advanced by other callers while we waited
+            idx = self.index
+            current_time = monotonic()
+            for _ in range(n):
+                i = idx
+                idx = (idx + 1) % n  # Move to the next key for round-robin
+                elapsed = current_time - window_starts[i]
+                # Roll the fixed window forward; the previous count only carries over
+                # if the window that just ended directly precedes the new one
+                if elapsed >= win:
+                    prev_counts[i] = curr_counts[i] if elapsed < 2 * win else 0
+                    curr_counts[i] = 0
+                    window_starts[i] += win * (elapsed // win)
+                    elapsed = current_time - window_starts[i]
+                # Estimate requests in the last `window` seconds and use the key if below the limit
+                if prev_counts[i] * (1 - elapsed / win) + curr_counts[i] < rate:
+                    curr_counts[i] += 1
+                    self.index = idx
+                    return keys[i]
+            self.index = idx
+            # If all keys are exhausted, join the pending wait or schedule one
+            # for the minimum time until a key can be used again
+            event = self._refill_event
+            if event is None:
+                event = self._refill_event = asyncio.Event()
+                min_wait = min(self._time_until_available(i, current_time) for i in range(n))
+                asyncio.get_running_loop().call_later(min_wait, event.set)
+            # Wait for the earliest key, then retry the scan
+            await event.wait()
+
+    def _time_until_available(self, i: int, current_time: float) -> float:
+        """
+        Returns the number of seconds until the estimate for key `i` drops below the
+        limit, assuming no further requests use it.
+        """
+        rate, win = self.rate_limit, self.window
+        prev, curr, start = self.prev_counts[i], self.curr_counts[i], self.window_starts[i]
+        if curr < rate:
+            # Within the current window, as the previous count's weight decays
+            # (prev is non-zero here, otherwise the key would have been admitted)
+            available_at = start + win * (1 - (rate - curr) / prev)
+        else:
+            # After the rollover, as the current count (then previous) decays
+            available_at = start + win + max(0.0, win * (1 - rate / curr))
+        return max(0.0, available_at - current_time)
+
+    async def penalize(self, key: str, retry_after: float) -> None:
+        """
+        Marks a key rejected by the target API (429) as exhausted for `retry_after`
+        seconds; after that its usage decays over one window like a full one.
+        """
+        i = self.api_keys.index(key)
+        self.prev_counts[i] = self.rate_limit
+        self.curr_counts[i] = self.rate_limit
+        self.window_starts[i] = time.monotonic() + retry_after - self.window
+
+    async def aclose(self) -> None:
+        """Nothing to release for in-memory state; present for parity with RedisAPIKeyManager."""
+
+# Sliding-window admission over the keys in KEYS order, run atomically in Redis.
+# Each key is a hash {prev, curr, start}; times are in milliseconds from the Redis clock,
+# so all workers and instances agree on them. ARGV: rate limit, window (ms).
+# Returns {1, index of the admitted key} or {0, milliseconds until a key frees up}.
+REDIS_ACQUIRE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local min_wait = nil
+for i, key in ipairs(KEYS) do
+    local state = redis.call('HMGET', key, 'prev', 'curr', 'start')
+    local prev = tonumber(state[1]) or 0
+    local curr = tonumber(state[2]) or 0
+    local start = tonumber(state[3]) or now
+    local elapsed = now - start
+    if elapsed >= window then
+        if elapsed < 2 * window then prev = curr else prev = 0 end
+        curr = 0
+        start = start + window * math.floor(elapsed / window)
+        elapsed = now - start
+    end
+    if prev * (1 - elapsed / window) + curr < rate then
+        redis.call('HSET', key, 'prev', prev, 'curr', curr + 1, 'start', start)
+        redis.call('PEXPIRE', key, start + 2 * window - now)
+        return {1, i - 1}
+    end
+    local available_at
+    if curr < rate then
+        available_at = start + window * (1 - (rate - curr) / prev)
+    else
+        available_at = start + window + math.max(0, window * (1 - rate / curr))
+    end
+    local wait = math.max(0, available_at - now)
+    if min_wait == nil or wait < min_wait then min_wait = wait end
+end
+return {0, math.ceil(min_wait)}
+"""
+
+# Marks KEYS[1] exhausted for ARGV[3] ms, matching APIKeyManager.penalize.
+# ARGV: rate limit, window (ms), retry-after (ms).
+REDIS_PENALIZE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local retry_after = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+redis.call('HSET', KEYS[1], 'prev', rate, 'curr', rate, 'start', now + retry_after - window)
+redis.call('PEXPIRE', KEYS[1], retry_after + window)
+"""
+
+class RedisAPIKeyManager:
+    """
+    Variant of APIKeyManager that keeps the sliding-window counters in Redis, so the
+    limit is enforced across all workers and proxy instances instead of per process.
+    Each admission is a single atomic Lua script call that scans the keys in
+    round-robin order. Redis entries are named by a hash of the API key, not the key itself.
+    """
+    def __init__(self, redis, api_keys: list[str], rate_limit: int, window: int = 60):
+        self.redis = redis
+        self.api_keys = api_keys
+        self.rate_limit = rate_limit
+        self.window = window  # Window interval in seconds (60 seconds = 1 minute)
+        self.redis_keys = [
+            "llm-proxy:rate-limit:" + hashlib.sha256(key.encode()).hexdigest()[:16]
+            for key in api_keys
+        ]
+        # Scripts are sent by SHA and loaded on first use
+        self._acquire = redis.register_script(REDIS_ACQUIRE_SCRIPT)
+        self._penalize = redis.register_script(REDIS_PENALIZE_SCRIPT)
+        self.index = 0  # Current index for round-robin in this process
+
+    async def get_available_key(self) -> str:
+        """
+        Returns an available API key whose estimated request count over the last
+        `window` seconds, across all users of the Redis server, is below the limit.
+        If all keys are exhausted, sleeps until the earliest one frees up, then retries.
+        """
+        n = len(self.api_keys)
+        window_ms = self.window * 1000
+        while True:
+            start = self.index
+            # Advance before awaiting so concurrent callers start from different keys
+            self.index = (start + 1) % n
+            order = [(start + offset) % n for offset in range(n)]
+            admitted, value = await self._acquire(
+                keys=[self.redis_keys[i] for i in order],
+                args=[self.rate_limit, window_ms],
+            )
+            if admitted:
+                i = order[value]
+                self.index = (i + 1) % n
+                return self.api_keys[i]
+            await asyncio.sleep(value / 1000)
+
+    async def penalize(self, key: str, retry_after: float) -> None:
         """
-        async with self.lock:
-            for _ in range(len(self.api_keys)):
-                key = self.api_keys[self.index]
-                stat = self.stats[key]
-                current_time = time.time()
-                # If the current window time has expired, reset the counter and update the window time
-                if current_time - stat["window_start"] >= self.window:
-                    stat["count"] = 0
-                    stat["window_start"] = current_time
-                # If the limit is not yet exhausted, use this key
-                if stat["count"] < self.rate_limit:
-                    stat["count"] += 1
-                    # Update index for round-robin
-                    self.index = (self.index + 1) % len(self.api_keys)
-                    return key
-                # Move to the next key
-                self.index = (self.index + 1) % len(self.api_keys)
-            # If all keys are exhausted, calculate the minimum wait time for the limit reset
-            wait_times = []
-            current_time = time.time()
-            for key in self.api_keys:
-                stat = self.stats[key]
-                wait_time = self.window - (current_time - stat["window_start"])
-                if wait_time < 0:
-                    wait_time = 0
-                wait_times.append(wait_time)
-            min_wait = min(wait_times)
-        # Wait for the required minimum time and retry
-        await asyncio.sleep(min_wait)
-        return await self.get_available_key()
-
-# Initialize API key manager
-key_manager = APIKeyManager(API_KEYS, RATE_LIMIT)
+        Marks a key rejected by the target API (429) as exhausted for `retry_after`
+        seconds for everyone sharing the Redis server.
+        """
+        i = self.api_keys.index(key)
+        await self._penalize(
+            keys=[self.redis_keys[i]],
+            args=[self.rate_limit, self.window * 1000, int(retry_after * 1000)],
+        )
+
+    async def aclose(self) -> None:
+        """Closes the Redis connection pool."""
+        await self.redis.aclose()
+
+class InflightLimiter:
+    """
+    Caps the number of requests in flight to the target API, so a flood of clients
+    queues here instead of opening unbounded upstream connections.
+    """
+    def __init__(self, max_inflight: int):
+        self.max_inflight = max_inflight
+        self.active = 0
+        self.cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        """Waits until fewer than `max_inflight` requests are active and takes a slot."""
+        async with self.cond:
+            await self.cond.wait_for(lambda: self.active < self.max_inflight)
+            self.active += 1
+
+    async def release(self) -> None:
+        """Frees a slot and wakes one waiter."""
+        async with self.cond:
+            self.active -= 1
+            self.cond.notify(1)
+
+class UpstreamStreamingResponse(StreamingResponse):
+    """
+    Streams the raw body of an upstream response. However sending ends (completed,
+    client disconnected or failed), the upstream response is closed and its in-flight
+    slot is released; a background task would be skipped on client disconnect.
+    """
+    def __init__(
+        self,
+        upstream: httpx.Response,
+        raw_headers: list[tuple[bytes, bytes]],
+        limiter: InflightLimiter,
+    ):
+        # The body is forwarded still encoded, so content-encoding is kept as is
+        super().__init__(upstream.aiter_raw(), status_code=upstream.status_code)
+        # Already filtered, lowercase byte pairs: assigned directly instead of passing a
+        # mapping that Starlette would re-encode (and that could not hold repeated headers)
+        self.raw_headers = raw_headers
+        self.upstream = upstream
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                await self.upstream.aclose()
+            finally:
+                await self.limiter.release()
+
+# Initialize API key manager and upstream concurrency limiter
+if REDIS_URL:
+    try:
+        import redis.asyncio as redis_asyncio
+    except ImportError:
+        sys.exit("Error: REDIS_URL is set but the 'redis' package is not installed. Install the project with the 'redis' extra.")
+    key_manager = RedisAPIKeyManager(redis_asyncio.from_url(REDIS_URL), API_KEYS, RATE_LIMIT)
+else:
+    key_manager = APIKeyManager(API_KEYS, RATE_LIMIT)
+inflight_limiter = InflightLimiter(MAX_INFLIGHT)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Creates a single HTTP client shared by all proxied requests, so connections
+    to the target API are pooled and kept alive, and closes it on shutdown.
+    HTTP/2 lets concurrent requests share one connection when the target supports it.
+    The pool holds MAX_INFLIGHT connections, so every request admitted by the in-flight
+    limiter gets one; excess requests queue in the limiter instead of timing out in the pool.
+    The key manager's resources (the Redis pool, if used) are released on shutdown too.
+    """
+    client = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(connect=5.0, read=180.0, write=30.0, pool=None),
+        limits=httpx.Limits(max_connections=MAX_INFLIGHT, max_keepalive_connections=MAX_INFLIGHT),
+    )
+    # Only the client's own headers are forwarded: the body is relayed still encoded,
+    # so httpx must not negotiate a compression (or identify itself) on the client's behalf
+    for name in ("accept", "accept-encoding", "user-agent"):
+        client.headers.pop(name, None)
+    app.state.client = client
+    try:
+        yield
+    finally:
+        await client.aclose()
+        await key_manager.aclose()
 
 # Create FastAPI instance
-app = FastAPI(title="Proxy API Gateway")
+app = FastAPI(title="Proxy API Gateway", lifespan=lifespan)
+
+PROXY_RAW_PATH_PREFIX = b"/proxy/"
+
+def raw_proxied_path(request: Request, full_path: str) -> bytes:
+    """
+    Returns the nested path as the client sent it, still percent-encoded, so that
+    encoded characters such as %3F, %23 or %2F reach the target API unchanged.
+    Falls back to re-quoting the decoded path when the server provides no raw_path.
+    """
+    raw_path = request.scope.get("raw_path")
+    if raw_path is not None and raw_path.startswith(PROXY_RAW_PATH_PREFIX):
+        return raw_path[len(PROXY_RAW_PATH_PREFIX):]
+    return quote(full_path, safe="/:@!$&'()*+,;=-._~").encode("ascii")
 
 @app.api_route("/proxy/{full_path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
 async def proxy(full_path: str, request: Request):
-    # Get API key and form headers
-    api_key = await key_manager.get_available_key()
-    headers = dict(request.headers)
-    headers.pop("host", None)
-    headers["Authorization"] = f"Bearer {api_key}"
+    # Raw ASGI header names are already lowercase bytes, so the pairs are filtered and
+    # passed to httpx as is; the client's own authorization header is replaced
+    forward_headers = [
+        (k, v) for k, v in request.headers.raw
+        if k not in HOP_BY_HOP_HEADERS and k != b"authorization"
+    ]
 
     # Read request body
     body = await request.body()
 
-    # Form target API URL by adding the nested path
-    target_url = urljoin(TARGET_API_URL, full_path)
-    print(f"Proxying request to {target_url}")
+    # Append the raw nested path to the pre-parsed TARGET_API_URL;
+    # the query string bytes from the ASGI scope are passed through untouched,
+    # keeping repeated keys and skipping Starlette's decode/re-split of request.url
+    client: httpx.AsyncClient = request.app.state.client
+    nested_path = raw_proxied_path(request, full_path)
+    raw_path = TARGET_RAW_PATH_PREFIX + nested_path if nested_path else TARGET_RAW_PATH
+    query_string = request.scope["query_string"]
+    if query_string:
+        raw_path += b"?" + query_string
+    try:
+        target_url = TARGET_URL.copy_with(raw_path=raw_path)
+    except (httpx.InvalidURL, UnicodeDecodeError) as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid request URL: {exc}") from exc
+    # Log the path only: query strings may carry secrets or user data
+    print(f"Proxying request to {TARGET_PATH_PREFIX + full_path if full_path else TARGET_URL.path}")
 
-    async with httpx.AsyncClient() as client:
+    # Each attempt takes a fresh key, so a rate-limited key is replaced by another one
+    attempts = len(key_manager.api_keys)
+    for attempt in range(attempts):
+        api_key = await key_manager.get_available_key()
+        upstream_request = client.build_request(
+            method=request.method,
+            url=target_url,
+            headers=[*forward_headers, (b"authorization", f"Bearer {api_key}".encode())],
+            content=body,
+        )
+        # Hold an in-flight slot from sending until the response body has been relayed
+        await inflight_limiter.acquire()
         try:
-            response = await client.request(
-                method=request.method,
-                url=target_url,
-                headers=headers,
-                params=dict(request.query_params),
-                content=body,
-                timeout=180.0
-            )
+            response = await client.send(upstream_request, stream=True)
         except httpx.RequestError as exc:
+            await inflight_limiter.release()
             raise HTTPException(status_code=502, detail=f"Error contacting the target API: {exc}") from exc
+        except BaseException:
+            await inflight_limiter.release()
+            raise
+
+        status_code = response.status_code
+        try:
+            if status_code == 429:
+                # The target's quota for this key is used up: keep it out of rotation
+                retry_after = parse_retry_after(
+                    response.headers.get("retry-after"),
+                    key_manager.window,
+                    RETRY_AFTER_MAX_WINDOWS * key_manager.window,
+                )
+                await key_manager.penalize(api_key, retry_after)
+            retry = status_code in RETRY_STATUS_CODES and attempt + 1 < attempts
+        except BaseException:
+            # penalize() may do I/O (Redis); never leave the response open or the slot taken
+            try:
+                await response.aclose()
+            finally:
+                await inflight_limiter.release()
+            raise
+        if not retry:
+            break
+        try:
+            await response.aclose()
+        finally:
+            await inflight_limiter.release()
+        if status_code != 429:
+            # Transient server error: back off exponentially before the next attempt
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
 
-    hop_by_hop = {
-        "connection",
-        "keep-alive",
-        "proxy-authenticate",
-        "proxy-authorization",
-        "te",
-        "trailer",
-        "transfer-encoding",
-        "upgrade",
-        "content-encoding",
-    }
-    filtered_headers = {
-        k: v
-        for k, v in response.headers.items()
-        if k.lower() not in hop_by_hop
-    }
-    return Response(content=response.content, status_code=response.status_code, headers=filtered_headers)
+    # Response headers are copied as raw pairs, keeping repeated ones such as set-cookie
+    raw_headers = [
+        (name, v) for k, v in response.headers.raw
+        if (name := k.lower()) not in HOP_BY_HOP_HEADERS
+    ]
+    # Forward the body chunk by chunk as it arrives
+    return UpstreamStreamingResponse(response, raw_headers, inflight_limiter)
 
 # Example of running the service:
-# uvicorn proxy_app:app --host 0.0.0.0 --port 8000
+# uvicorn proxy_app:app --host 0.0.0.0 --port 8000 --loop uvloop --http httptools
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("proxy_app:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # DEV=1 enables the auto-reloader, which runs a single worker; otherwise WORKERS
+    # processes are started. Without REDIS_URL, key rate limits are tracked per worker process.
+    dev_mode = os.getenv("DEV") == "1"
+    uvicorn.run(
+        "proxy_app:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        reload=dev_mode,
+        workers=1 if dev_mode else int(os.getenv("WORKERS", "1")),
+        # uvloop is not available on Windows; fall back to the default asyncio loop there
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+    )